@@ -5,12 +5,12 @@ PerSoftware Seta Calculation Tool Language (Seta) Copyright (c)2022.
 Seta is a tool programming language by PerSoftware Foundation to calculate the expressions in math and physics.
 """
 
-from typing import Union, Iterable, Optional
-from io import StringIO
+from typing import Union, TextIO
 import sys
 import os
+import re
+import functools
 import operator as sys_operator
-import seta_operator
 
 VARIABLE_NUMERIC = 1  # Numeric values
 VARIABLE_STRING_CONST = 2  # Constant strings
@@ -25,6 +25,8 @@ TYPEHINT_NUMERIC = Union[int, float]
 SETA_SOC = 1
 
 EOF = None
+_UNRESOLVED = object()  # An operand which cannot be resolved
+_IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_#]*')  # Letters, digits, _ and #, not leading with a digit or #
 
 OPERATION_ADD = 'add'  # +
 OPERATION_SUB = 'sub'  # -
@@ -34,23 +36,69 @@ OPERATION_POWER = 'power'  # ^ (operator ** in Python)
 COMPARISON_ABOVE = '>'
 COMPARISON_BELOW = '<'
 COMPARISON_EQUAL = '='
-COMPARISON_NOTABOVE = '<='
-COMPARISON_NOTBELOW = '>='
-COMPARISON_NOTEQUAL = '!='
+# Interned like the parsed arguments, names and one-char strings already are by Python itself
+COMPARISON_NOTABOVE = sys.intern('<=')
+COMPARISON_NOTBELOW = sys.intern('>=')
+COMPARISON_NOTEQUAL = sys.intern('!=')
+
+OP_SET = 0
+OP_CALC = 1
+OP_LOAD = 2
+OP_EMP = 3
+OP_IF = 4
+OP_CALL = 5
+OP_ENDIF = 6
+
+_OPCODES = {
+    'set': OP_SET,
+    'calc': OP_CALC,
+    'load': OP_LOAD,
+    'emp': OP_EMP,
+    'if': OP_IF,
+    'call': OP_CALL,
+    'endif': OP_ENDIF,
+}
+
+_CALC_OPS = {
+    OPERATION_ADD: sys_operator.add,
+    OPERATION_SUB: sys_operator.sub,
+    OPERATION_MUL: sys_operator.mul,
+    OPERATION_DIV: sys_operator.truediv,
+    OPERATION_POWER: sys_operator.pow,
+}
+
+_CMP_OPS = {
+    COMPARISON_ABOVE: sys_operator.gt,
+    COMPARISON_BELOW: sys_operator.lt,
+    COMPARISON_EQUAL: sys_operator.eq,
+    COMPARISON_NOTABOVE: sys_operator.le,
+    COMPARISON_NOTBELOW: sys_operator.ge,
+    COMPARISON_NOTEQUAL: sys_operator.ne,
+}
+
+_VTYPE_NAMES = {
+    VARIABLE_NUMERIC: 'numeric',
+    VARIABLE_STRING_CONST: 'cstring',
+}
+
+_FTC_TYPES = {  # Target numeric types of the force type changing
+    'integer': int,
+    'float': float,
+}
 
 
 def VARIABLE_TYPE_FORMAT(typeCode: int):
-    types = {
-        VARIABLE_NUMERIC: 'numeric',
-        VARIABLE_STRING_CONST: 'cstring',
-    }
-    return types.get(typeCode, 'UNKNOWN-TYPE')
+    return _VTYPE_NAMES.get(typeCode, 'UNKNOWN-TYPE')
 
 
 class SetaException:
-    def __init__(self, clsname: str, msg: str, lineno: int, file: str, code: Union[None, str] = None):
+    __slots__ = ('clsname', 'msg', 'args', 'lineno', 'code', 'file')
+
+    def __init__(self, clsname: str, msg: str, lineno: int, file: str, code: Union[None, str] = None,
+                 args: tuple = ()):
         self.clsname = clsname
-        self.msg = msg
+        self.msg = msg  # Formatted with args by %, only if args are given
+        self.args = args
         self.lineno = lineno
         self.code = code
         self.file = file
@@ -59,74 +107,46 @@ class SetaException:
         return f"""seta.env.SetaCore.SetaException at line {self.lineno}:
     In file {self.file}, line {self.lineno}:
         {' '.join([self.code[0], *self.code[1]]) if self.code else "[No Code Record]"}
-{self.clsname}: {self.msg}
+{self.clsname}: {self.msg % self.args if self.args else self.msg}
 """
 
 
-class Variable:
-    def __init__(self, name, env, vType: int = VARIABLE_NUMERIC):
-        self.__type = vType
-        self.__env: SetaRuntime = env
-        self.__value = None
-        self.__name = name
-
-    @property
-    def name(self):
-        return self.__name
+class Cursor:
+    __slots__ = ('lineno', 'file', 'code')
 
-    @property
-    def type(self) -> int:
-        return self.__type
+    def __init__(self, lineno: int, file: str, code: Union[None, tuple] = None):
+        self.lineno = lineno  # Line number of the current instruction
+        self.file = file
+        self.code = code  # The current instruction, (operation, arguments, opcode)
 
-    @property
-    def defined(self) -> bool:
-        return self.__value is not None
 
-    @property
-    def undefined(self) -> bool:
-        return self.__value is None
+class Variable:
+    __slots__ = ('name', 'type', 'value', 'numeric', 'string', '_env')
 
-    @property
-    def value(self) -> Union[str, TYPEHINT_NUMERIC]:
-        return self.__value
+    def __init__(self, name, env, vType: int = VARIABLE_NUMERIC):
+        self.name = name
+        self.type: int = vType
+        self.value: Union[str, TYPEHINT_NUMERIC, None] = None  # Use set() to assign with the type check
+        self.numeric: bool = vType == VARIABLE_NUMERIC
+        self.string: bool = vType == VARIABLE_STRING_CONST
+        self._env: SetaRuntime = env
 
     @property
-    def numeric(self) -> bool:
-        return self.__type == VARIABLE_NUMERIC
+    def defined(self) -> bool:
+        return self.value is not None
 
     @property
-    def string(self) -> bool:
-        return self.__type == VARIABLE_STRING_CONST
+    def undefined(self) -> bool:
+        return self.value is None
 
     def set(self, value: Union[str, TYPEHINT_NUMERIC]) -> bool:
-        if isinstance(value, str):
-            if self.__type == VARIABLE_STRING_CONST:
-                self.__value = value
-                return True
-            else:
-                self.__env.error(SetaException(
-                    clsname='ValueException',
-                    msg=f'Variable "{self.__name}" expected type {VARIABLE_TYPE_FORMAT(self.__type)},'
-                        f' but an unexpected type was given.',
-                    lineno=self.__env.current['lineno'],
-                    file=self.__env.current['file'],
-                    code=self.__env.current['code']
-                ))
-                return False
-        else:
-            if self.__type == VARIABLE_NUMERIC:
-                self.__value = value
-                return True
-            else:
-                self.__env.error(SetaException(
-                    clsname='ValueException',
-                    msg=f'Variable "{self.__name}" expected type {VARIABLE_TYPE_FORMAT(self.__type)},'
-                        f' but an unexpected type was given.',
-                    lineno=self.__env.current['lineno'],
-                    file=self.__env.current['file'],
-                    code=self.__env.current['code']
-                ))
-                return False
+        expected = VARIABLE_STRING_CONST if isinstance(value, str) else VARIABLE_NUMERIC
+        if self.type == expected:
+            self.value = value
+            return True
+        self._env._err('ValueException', 'Variable "%s" expected type %s,'
+                       ' but an unexpected type was given.', self.name, VARIABLE_TYPE_FORMAT(self.type))
+        return False
 
     @property
     def positive(self) -> Union[bool, None]:
@@ -203,13 +223,13 @@ class BuiltinsPackage(Package):
         self.ObjectAppend('breakpoint', self.breakpoint)
 
     def breakpoint(self):
-        npf = ''
-        for var in self.runtime.namespace.values():
-            npf += f'\tVariable:\t{var.name}\n\tType:\t\t{self.runtime.stdio.BLUE}{VARIABLE_TYPE_FORMAT(var.type)}{self.runtime.stdio.YELLOW}\n\tValue:\t\t{var.value}\n\n'
+        blue, yellow = self.runtime.stdio.BLUE, self.runtime.stdio.YELLOW
+        npf = ''.join(f'\tVariable:\t{var.name}\n\tType:\t\t{blue}{VARIABLE_TYPE_FORMAT(var.type)}{yellow}\n'
+                      f'\tValue:\t\t{var.value}\n\n' for var in self.runtime.namespace.values())
         self.runtime.stdio.setColor(self.runtime.stdio.YELLOW)
-        self.runtime.stdio.output(f'\n\n{"=" * 30}\nBreakpoint at line {self.runtime.current["lineno"]}:\n'
-                                  f'    File {self.runtime.current["file"]}, line {self.runtime.current["lineno"]}:\n'
-                                  f'        {" ".join([self.runtime.current["code"][0], *self.runtime.current["code"][1]])}\n'
+        self.runtime.stdio.output(f'\n\n{"=" * 30}\nBreakpoint at line {self.runtime.current.lineno}:\n'
+                                  f'    File {self.runtime.current.file}, line {self.runtime.current.lineno}:\n'
+                                  f'        {" ".join([self.runtime.current.code[0], *self.runtime.current.code[1]])}\n'
                                   f'Program debug information:\n'
                                   f'Runtime Status: {self.runtime.status}\n'
                                   f'Calculation Result Cathe: {self.runtime.ams}\n'
@@ -221,32 +241,16 @@ class BuiltinsPackage(Package):
 
     def nInput(self, arg: str, *msg: str):
         if not Seta.requireIdentifier(arg):
-            self.runtime.error(SetaException(
-                clsname='ArgumentException',
-                msg='Force type change expected an identifier name, but an invalid argument appeared.',
-                lineno=self.runtime.current['lineno'],
-                file=self.runtime.support.f.name,
-                code=self.runtime.current['code']
-            ))
+            self.runtime._err('ArgumentException', 'Force type change expected an identifier name, but an invalid'
+                                                   ' argument appeared.')
             return
-        var = self.runtime.NamespaceSearch(arg)
+        var = self.runtime._ns_get(arg)
         if var is None:
-            self.runtime.error(SetaException(
-                clsname='VariableException',
-                msg=f'Cannot find variable {arg}.',
-                lineno=self.runtime.current['lineno'],
-                file=self.runtime.support.f.name,
-                code=self.runtime.current['code']
-            ))
+            self.runtime._err('VariableException', 'Cannot find variable %s.', arg)
             return
         if var.type != VARIABLE_NUMERIC:
-            self.runtime.error(SetaException(
-                clsname='TypeException',
-                msg=f'Force type change expected a numeric variable, but {VARIABLE_TYPE_FORMAT(var.type)} was given.',
-                lineno=self.runtime.current['lineno'],
-                file=self.runtime.support.f.name,
-                code=self.runtime.current['code']
-            ))
+            self.runtime._err('TypeException', 'Force type change expected a numeric variable, but'
+                                               ' %s was given.', VARIABLE_TYPE_FORMAT(var.type))
             return
         if not msg:
             msg = 'Input requires to be numeric, please enter again:'.split(' ')
@@ -264,22 +268,10 @@ class BuiltinsPackage(Package):
     def wrap(self, lines: str = '1'):
         lines = Seta.requireInt(lines)
         if lines is None:
-            self.runtime.error(SetaException(
-                clsname='ArgumentException',
-                msg='Argument 1 "lines" expected a positive integer.',
-                lineno=self.runtime.current['lineno'],
-                file=self.runtime.support.f.name,
-                code=self.runtime.current['code']
-            ))
+            self.runtime._err('ArgumentException', 'Argument 1 "lines" expected a positive integer.')
             return
         if lines <= 0:
-            self.runtime.error(SetaException(
-                clsname='ArgumentException',
-                msg='Argument 1 "lines" expected a positive integer.',
-                lineno=self.runtime.current['lineno'],
-                file=self.runtime.support.f.name,
-                code=self.runtime.current['code']
-            ))
+            self.runtime._err('ArgumentException', 'Argument 1 "lines" expected a positive integer.')
             return
         self.runtime.stdio.output('\n' * lines)
 
@@ -291,82 +283,53 @@ class BuiltinsPackage(Package):
         :return: None
         """
         if not Seta.requireIdentifier(arg):
-            self.runtime.error(SetaException(
-                clsname='ArgumentException',
-                msg='Force type change expected an identifier name, but an invalid argument appeared.',
-                lineno=self.runtime.current['lineno'],
-                file=self.runtime.support.f.name,
-                code=self.runtime.current['code']
-            ))
+            self.runtime._err('ArgumentException', 'Force type change expected an identifier name, but an invalid'
+                                                   ' argument appeared.')
             return
-        var = self.runtime.NamespaceSearch(arg)
+        var = self.runtime._ns_get(arg)
         if var is None:
-            self.runtime.error(SetaException(
-                clsname='VariableException',
-                msg=f'Cannot find variable {arg}.',
-                lineno=self.runtime.current['lineno'],
-                file=self.runtime.support.f.name,
-                code=self.runtime.current['code']
-            ))
+            self.runtime._err('VariableException', 'Cannot find variable %s.', arg)
             return
         if var.type != VARIABLE_NUMERIC:
-            self.runtime.error(SetaException(
-                clsname='TypeException',
-                msg=f'Force type change expected a numeric variable, but {VARIABLE_TYPE_FORMAT(var.type)} was given.',
-                lineno=self.runtime.current['lineno'],
-                file=self.runtime.support.f.name,
-                code=self.runtime.current['code']
-            ))
+            self.runtime._err('TypeException', 'Force type change expected a numeric variable, but'
+                                               ' %s was given.', VARIABLE_TYPE_FORMAT(var.type))
             return
-        func = {
-            'integer': int,
-            'float': float,
-        }.get(tar, None)
+        func = _FTC_TYPES.get(tar, None)
         if func is None:
-            self.runtime.error(SetaException(
-                clsname='ArgumentException',
-                msg=f'Invalid numeric type was given. Possible choices: integer, float.',
-                lineno=self.runtime.current['lineno'],
-                file=self.runtime.support.f.name,
-                code=self.runtime.current['code']
-            ))
+            self.runtime._err('ArgumentException', 'Invalid numeric type was given. Possible choices: integer, float.')
             return
         var.set(func(var.value))
 
     def display(self, var: str):
         if not Seta.requireIdentifier(var):
-            self.runtime.error(SetaException(
-                clsname='ArgumentException',
-                msg=f'Argument 1 "var" expected a variable.',
-                lineno=self.runtime.current['lineno'],
-                file=self.runtime.support.f.name,
-                code=self.runtime.current['code']
-            ))
+            self.runtime._err('ArgumentException', 'Argument 1 "var" expected a variable.')
             return
-        v = self.runtime.NamespaceSearch(var)
+        v = self.runtime._ns_get(var)
         if v is None:
-            self.runtime.error(SetaException(
-                clsname='ArgumentException',
-                msg=f'Argument 1 "var" expected a variable, but variable {var} was not found.',
-                lineno=self.runtime.current['lineno'],
-                file=self.runtime.support.f.name,
-                code=self.runtime.current['code']
-            ))
+            self.runtime._err('ArgumentException', 'Argument 1 "var" expected a variable, but variable %s was'
+                                                   ' not found.', var)
             return
         self.runtime.stdio.output(v.value)
 
 
 class SetaRuntime:
+    _ARITY = (  # Indexed by opcode, (min, max) number of arguments, None for no limit
+        (3, None),  # OP_SET
+        (4, 4),  # OP_CALC
+        (1, 2),  # OP_LOAD
+        (0, 0),  # OP_EMP
+        (3, 3),  # OP_IF
+        (0, None),  # OP_CALL
+        (0, 0),  # OP_ENDIF
+    )
+
     def __init__(self):
         self.status = RUNTIME_STATUS_PREPARING
         self.namespace = dict()
+        self._ns_get = self.namespace.get  # Bound lookups for the hot paths, namespace is never rebound
         self.stdio = StandardIO()
         self.status = RUNTIME_STATUS_RUNNING
-        self.current = {
-            'lineno': 0,
-            'file': '<stdin>',
-            'code': None,
-        }
+        self.current = Cursor(0, '<stdin>', None)
         self.operation = self.Operation(self)
         self.support = None
         self.ams = 0
@@ -375,166 +338,97 @@ class SetaRuntime:
         self.packages = {
             'builtins': BuiltinsPackage(self),
         }
+        self._pkg_get = self.packages.get
+        self._handlers = (  # Indexed by opcode
+            self.com_set,
+            self.com_calc,
+            self.com_load,
+            self.com_emp,
+            self.com_if,
+            self.com_call,
+            self.com_endif,
+        )
 
     def NullPointerTraceback(self):
-        self.error(SetaException(
-            clsname='NullPointerException',
-            msg='Cannot call the program pointer before setting the pointer address.',
-            lineno=self.current['lineno'],
-            file=self.support.f.name,
-            code=self.current['code']
-        ))
+        self._err('NullPointerException', 'Cannot call the program pointer before setting the pointer address.')
 
     def setSupport(self, support):
         support: Union[SetaStringOperationCode]
         self.support = support
-        self.current = {
-            'lineno': 2,
-            'file': self.support.f.name,
-            'code': self.support.instruction,
-        }
+        self.current = Cursor(2, self.support.f.name, self.support.instruction)
 
     @property
     def instruction(self):
-        l = self.current['code']
-        self.current['lineno'] += 1
-        self.current['code'] = self.support.instruction
+        l = self.current.code
+        self.current.lineno += 1
+        self.current.code = self.support.instruction
         return l
 
+    def _err(self, clsname: str, msg: str, *args):
+        """
+        Report an error at the current instruction.
+        :param clsname: the exception class name
+        :param msg: the error message, a %-format template if args are given
+        :param args: values for the template, formatted only when the error is printed
+        :return: None
+        """
+        self.error(SetaException(
+            clsname=clsname,
+            msg=msg,
+            lineno=self.current.lineno,
+            file=self.current.file,
+            code=self.current.code,
+            args=args
+        ))
+
     def error(self, exc: SetaException):
-        self.stdio.setColor(self.stdio.RED)
-        self.stdio.print(f"""
+        self.stdio.output(f"""{self.stdio.RED}
 
-{exc.format()}""")
+{exc.format()}
+{self.stdio.DEFAULT}""")
         self.status = RUNTIME_STATUS_ERROR
-        self.stdio.setColor(self.stdio.DEFAULT)
 
     class Operation:
         def __init__(self, env):
             self.__env: SetaRuntime = env
 
+        def _binop(self, name: str, oper, arg1: Variable, arg2: Variable,
+                   check=None) -> Union[TYPEHINT_NUMERIC, None]:
+            """
+            Run a binary numeric operation on two variables.
+            :param name: the operation name used in the error messages
+            :param oper: the function doing the calculation
+            :param check: optional function returning an error message if the values cannot be calculated
+            :return: the calculation result, or None on error
+            """
+            for arg in (arg1, arg2):
+                if not arg.numeric:
+                    self.__env._err('TypeException', 'Operation %s needs variable "%s" to be numeric.', name, arg.name)
+                    return None
+            if check is not None:
+                msg = check(arg1, arg2)
+                if msg:
+                    self.__env._err('MathException', msg)
+                    return None
+            return oper(arg1.value, arg2.value)
+
         def add(self, arg1: Variable, arg2: Variable) -> Union[TYPEHINT_NUMERIC, None]:
-            if not arg1.numeric:
-                self.__env.error(SetaException(
-                    clsname='TypeException',
-                    msg=f'Operation ADD needs variable "{arg1.name}" to be numeric.',
-                    lineno=self.__env.current['lineno'],
-                    file=self.__env.current['file'],
-                    code=self.__env.current['code']
-                ))
-                return None
-            if not arg2.numeric:
-                self.__env.error(SetaException(
-                    clsname='TypeException',
-                    msg=f'Operation ADD needs variable "{arg1.name}" to be numeric.',
-                    lineno=self.__env.current['lineno'],
-                    file=self.__env.current['file'],
-                    code=self.__env.current['code']
-                ))
-                return None
-            return arg1.value + arg2.value
+            return self._binop('ADD', sys_operator.add, arg1, arg2)
 
         def sub(self, arg1: Variable, arg2: Variable) -> Union[TYPEHINT_NUMERIC, None]:
-            if not arg1.numeric:
-                self.__env.error(SetaException(
-                    clsname='TypeException',
-                    msg=f'Operation SUB needs variable "{arg1.name}" to be numeric.',
-                    lineno=self.__env.current['lineno'],
-                    file=self.__env.current['file'],
-                    code=self.__env.current['code']
-                ))
-                return None
-            if not arg2.numeric:
-                self.__env.error(SetaException(
-                    clsname='TypeException',
-                    msg=f'Operation SUB needs variable "{arg1.name}" to be numeric.',
-                    lineno=self.__env.current['lineno'],
-                    file=self.__env.current['file'],
-                    code=self.__env.current['code']
-                ))
-                return None
-            return arg1.value - arg2.value
+            return self._binop('SUB', sys_operator.sub, arg1, arg2)
 
         def mul(self, arg1: Variable, arg2: Variable) -> Union[TYPEHINT_NUMERIC, None]:
-            if not arg1.numeric:
-                self.__env.error(SetaException(
-                    clsname='TypeException',
-                    msg=f'Operation MUL needs variable "{arg1.name}" to be numeric.',
-                    lineno=self.__env.current['lineno'],
-                    file=self.__env.current['file'],
-                    code=self.__env.current['code']
-                ))
-                return None
-            if not arg2.numeric:
-                self.__env.error(SetaException(
-                    clsname='TypeException',
-                    msg=f'Operation MUL needs variable "{arg1.name}" to be numeric.',
-                    lineno=self.__env.current['lineno'],
-                    file=self.__env.current['file'],
-                    code=self.__env.current['code']
-                ))
-                return None
-            return arg1.value * arg2.value
+            return self._binop('MUL', sys_operator.mul, arg1, arg2)
 
         def div(self, arg1: Variable, arg2: Variable) -> Union[TYPEHINT_NUMERIC, None]:
-            if not arg1.numeric:
-                self.__env.error(SetaException(
-                    clsname='TypeException',
-                    msg=f'Operation DIV needs variable "{arg1.name}" to be numeric.',
-                    lineno=self.__env.current['lineno'],
-                    file=self.__env.current['file'],
-                    code=self.__env.current['code']
-                ))
-                return None
-            if not arg2.numeric:
-                self.__env.error(SetaException(
-                    clsname='TypeException',
-                    msg=f'Operation DIV needs variable "{arg1.name}" to be numeric.',
-                    lineno=self.__env.current['lineno'],
-                    file=self.__env.current['file'],
-                    code=self.__env.current['code']
-                ))
-                return None
-            if arg2.value == 0:
-                self.__env.error(SetaException(
-                    clsname='MathException',
-                    msg=f'Variable {arg1.name} is divided by zero.',
-                    lineno=self.__env.current['lineno'],
-                    file=self.__env.current['file'],
-                    code=self.__env.current['code']
-                ))
-                return None
-            return arg1.value / arg2.value
+            return self._binop('DIV', sys_operator.truediv, arg1, arg2,
+                               lambda a, b: f'Variable {a.name} is divided by zero.' if b.value == 0 else None)
 
         def power(self, arg1: Variable, arg2: Variable) -> Union[TYPEHINT_NUMERIC, None]:
-            if not arg1.numeric:
-                self.__env.error(SetaException(
-                    clsname='TypeException',
-                    msg=f'Operation DIV needs variable "{arg1.name}" to be numeric.',
-                    lineno=self.__env.current['lineno'],
-                    file=self.__env.current['file'],
-                    code=self.__env.current['code']
-                ))
-                return None
-            if not arg2.numeric:
-                self.__env.error(SetaException(
-                    clsname='TypeException',
-                    msg=f'Operation DIV needs variable "{arg1.name}" to be numeric.',
-                    lineno=self.__env.current['lineno'],
-                    file=self.__env.current['file'],
-                    code=self.__env.current['code']
-                ))
-                return None
-            if arg1.value == arg2.value == 0:
-                self.__env.error(SetaException(
-                    clsname='MathException',
-                    msg=f'The base of a zero exponential cannot be zero.',
-                    lineno=self.__env.current['lineno'],
-                    file=self.__env.current['file'],
-                    code=self.__env.current['code']
-                ))
-                return None
-            return arg1.value ** arg2.value
+            return self._binop('POWER', sys_operator.pow, arg1, arg2,
+                               lambda a, b: 'The base of a zero exponential cannot be zero.'
+                               if a.value == b.value == 0 else None)
 
         @staticmethod
         def equal(arg1: Variable, arg2: Variable) -> bool:
@@ -561,7 +455,15 @@ class SetaRuntime:
             return arg1.value != arg2.value
 
     def NamespaceSearch(self, name: str) -> Union[Variable, None]:
-        return self.namespace.get(name, None)
+        """
+        Find a variable by name.
+        :param name: the variable name
+        :return: the Variable, or None if it is not declared
+
+        The namespace only holds Variable objects (see NamespaceInput), so the callers
+        use the result directly without checking its type.
+        """
+        return self._ns_get(name)
 
     def NamespaceInput(self, value: Variable) -> bool:  # Return if the variable has already existed before.
         ex = value.name in self.namespace
@@ -569,7 +471,7 @@ class SetaRuntime:
         return ex
 
     def PackageSearch(self, name: str) -> Union[Package, None]:
-        return self.packages.get(name, None)
+        return self._pkg_get(name)
 
     def PackageInput(self, pack: Package) -> bool:  # Return if the package has already existed before.
         ex = pack.name in self.packages
@@ -577,141 +479,65 @@ class SetaRuntime:
         return ex
 
     def run(self):
+        current = self.current
+        support = self.support
+        handlers = self._handlers
+        arity = self._ARITY
         while True:
             if self.status:
                 sys.exit()
-            if self.current['code'] == EOF:
+            code = current.code
+            if code == EOF:
                 if self.ifs:
-                    self.error(SetaException(
-                        clsname='BlockException',
-                        msg='If-comparison block is not closed at the end of the program.',
-                        lineno=self.current['lineno'],
-                        file=self.support.f.name,
-                        code=self.current['code']
-                    ))
+                    self._err('BlockException', 'If-comparison block is not closed at the end of the program.')
                 sys.exit()
-            com: str = self.current['code'][0]
-            args = self.current['code'][1]
-            if com.lower() == 'endif':
-                try:
-                    self.com_endif(*args)
-                except TypeError:
-                    self.error(SetaException(
-                        clsname='ArgumentException',
-                        msg='Invalid number of the arguments.',
-                        lineno=self.current['lineno'],
-                        file=self.support.f.name,
-                        code=self.current['code']
-                    ))
-                self.current['lineno'] += 1
-                self.current['code'] = self.support.instruction
-                continue
+            com, args, op = code
 
             # Here skip the unreachable instructions caused by if-comparison.
-            if self.ifs:
-                if com.lower() == 'if':  # Increase the if-comparison block counter
-                    self.ifs = self.ifs + 1  # It'll be cleared by endif instruction
-                self.current['lineno'] += 1
-                self.current['code'] = self.support.instruction
-                continue
-
-            if com.lower() == 'set':
-                try:
-                    self.com_set(*args)
-                except TypeError:
-                    self.error(SetaException(
-                        clsname='ArgumentException',
-                        msg='Invalid number of the arguments.',
-                        lineno=self.current['lineno'],
-                        file=self.support.f.name,
-                        code=self.current['code']
-                    ))
-            elif com.lower() == 'calc':
-                try:
-                    self.com_calc(*args)
-                except TypeError:
-                    self.error(SetaException(
-                        clsname='ArgumentException',
-                        msg='Invalid number of the arguments.',
-                        lineno=self.current['lineno'],
-                        file=self.support.f.name,
-                        code=self.current['code']
-                    ))
-            elif com.lower() == 'load':
-                try:
-                    self.com_load(*args)
-                except TypeError:
-                    self.error(SetaException(
-                        clsname='ArgumentException',
-                        msg='Invalid number of the arguments.',
-                        lineno=self.current['lineno'],
-                        file=self.support.f.name,
-                        code=self.current['code']
-                    ))
-            elif com.lower() == 'emp':
-                try:
-                    self.com_emp(*args)
-                except TypeError:
-                    self.error(SetaException(
-                        clsname='ArgumentException',
-                        msg='Invalid number of the arguments.',
-                        lineno=self.current['lineno'],
-                        file=self.support.f.name,
-                        code=self.current['code']
-                    ))
-            elif com.lower() == 'if':
-                try:
-                    self.com_if(*args)
-                except TypeError:
-                    self.error(SetaException(
-                        clsname='ArgumentException',
-                        msg='Invalid number of the arguments.',
-                        lineno=self.current['lineno'],
-                        file=self.support.f.name,
-                        code=self.current['code']
-                    ))
-            elif com.lower() == 'call':
-                try:
-                    self.com_call(*args)
-                except TypeError:
-                    self.error(SetaException(
-                        clsname='ArgumentException',
-                        msg='Invalid number of the arguments.',
-                        lineno=self.current['lineno'],
-                        file=self.support.f.name,
-                        code=self.current['code']
-                    ))
+            # "endif" still goes to its handler, which closes the innermost block.
+            if self.ifs and op != OP_ENDIF:
+                self.ifs += op == OP_IF  # A nested block is counted until its own endif
             else:
-                self.error(SetaException(
-                    clsname='UnsupportedOperationException',
-                    msg=f'Unsupported operation {com}.',
-                    lineno=self.current['lineno'],
-                    file=self.support.f.name,
-                    code=self.current['code']
-                ))
-            self.current['lineno'] += 1
-            self.current['code'] = self.support.instruction
+                if op is None:
+                    self._err('UnsupportedOperationException', 'Unsupported operation %s.', com)
+                else:
+                    low, high = arity[op]
+                    if low <= len(args) and (high is None or len(args) <= high):
+                        handlers[op](*args)
+                    else:
+                        self._err('ArgumentException', 'Invalid number of the arguments.')
+            current.lineno += 1
+            current.code = support.instruction
+
+    def _resolve_operand(self, arg: str, operation: Union[str, None] = None):
+        """
+        Resolve an operand of calc or if: a numeric literal, @AMS or a variable.
+        :param arg: the operand
+        :param operation: the calculation requiring a numeric operand, None for any type
+        :return: the value, or _UNRESOLVED after the error is reported
+        """
+        if arg == '@AMS':  # The calculation result cache, used by most of the calculations
+            return self.ams
+        v = Seta.requireReal(arg)
+        if v is not None:
+            return v
+        var = self._ns_get(arg)  # A Variable or None, see NamespaceSearch
+        if var is None:
+            self._err('VariableException', 'Undeclared variable %s cannot be resolved.', arg)
+            return _UNRESOLVED
+        if operation is not None and not var.numeric:
+            self._err('TypeException', 'Operation %s needs variable "%s" to be numeric.', operation.upper(), arg)
+            return _UNRESOLVED
+        return var.value
 
     def com_call(self, *args):
         if self.ptr is None:
-            self.error(SetaException(
-                clsname='NullPointerException',
-                msg=f'Cannot call the program pointer before setting the pointer address.',
-                lineno=self.current['lineno'],
-                file=self.support.f.name,
-                code=self.current['code']
-            ))
+            self._err('NullPointerException', 'Cannot call the program pointer before setting the pointer address.')
             return
-        if not callable(self.ptr):
-            self.error(SetaException(
-                clsname='ArgumentException',
-                msg=f'The target of the calling is not callable.',
-                lineno=self.current['lineno'],
-                file=self.support.f.name,
-                code=self.current['code']
-            ))
-            return
-        self.ptr(*args)
+        try:
+            self.ptr(*args)
+        except TypeError:  # The arguments do not match the target
+            self._err('ArgumentException', 'Invalid number of the arguments.')
 
     def com_load(self, package: str, identifier: Union[str, None] = None):
         """
@@ -723,25 +549,16 @@ class SetaRuntime:
         if identifier is None:  # The package name "builtins" is ignored.
             identifier = package
             package = 'builtins'
-        pack = self.PackageSearch(package)
+        pack = self._pkg_get(package)
         if pack is None:
-            self.error(SetaException(
-                clsname='PackageException',
-                msg=f'Cannot find package {package}.',
-                lineno=self.current['lineno'],
-                file=self.support.f.name,
-                code=self.current['code']
-            ))
+            self._err('PackageException', 'Cannot find package %s.', package)
             return
         obj: Union[object, None] = pack.ObjectSearch(identifier)
         if obj is None:
-            self.error(SetaException(
-                clsname='PackageException',
-                msg=f'Cannot find object {identifier} in package {package}.',
-                lineno=self.current['lineno'],
-                file=self.support.f.name,
-                code=self.current['code']
-            ))
+            self._err('PackageException', 'Cannot find object %s in package %s.', identifier, package)
+            return
+        if not callable(obj):  # Checked once here rather than on every call of the pointer
+            self._err('ArgumentException', 'Object %s in package %s is not callable.', identifier, package)
             return
         self.ptr = obj
 
@@ -749,65 +566,20 @@ class SetaRuntime:
         self.ifs = self.ifs - 1 if self.ifs else 0
 
     def com_if(self, arg1, cmp, arg2):
-        var1 = Seta.requireReal(arg1)
-        if arg1 == '@AMS':
-            var1 = self.ams
-        if var1 is None:
-            var1 = self.NamespaceSearch(arg1)
-        if var1 is None:
-            self.error(SetaException(
-                clsname='VariableException',
-                msg=f'Undeclared variable {arg1} cannot be resolved.',
-                lineno=self.current['lineno'],
-                file=self.support.f.name,
-                code=self.current['code']
-            ))
+        var1 = self._resolve_operand(arg1)
+        if var1 is _UNRESOLVED:
             return
-        else:
-            var1 = var1.value if isinstance(var1, Variable) else var1
-        var2 = Seta.requireReal(arg2)
-        if arg2 == '@AMS':
-            var2 = self.ams
-        if var2 is None:
-            var2 = self.NamespaceSearch(arg2)
-        if var2 is None:
-            self.error(SetaException(
-                clsname='VariableException',
-                msg=f'Undeclared variable {arg2} cannot be resolved.',
-                lineno=self.current['lineno'],
-                file=self.support.f.name,
-                code=self.current['code']
-            ))
+        var2 = self._resolve_operand(arg2)
+        if var2 is _UNRESOLVED:
             return
-        else:
-            var2 = var2.value if isinstance(var2, Variable) else var2
-        oper = {
-            COMPARISON_ABOVE: seta_operator.above,
-            COMPARISON_BELOW: seta_operator.below,
-            COMPARISON_EQUAL: seta_operator.equal,
-            COMPARISON_NOTABOVE: seta_operator.notabove,
-            COMPARISON_NOTBELOW: seta_operator.notbelow,
-            COMPARISON_NOTEQUAL: seta_operator.notequal,
-        }.get(cmp, None)
+        oper = _CMP_OPS.get(cmp, None)
         if oper is None:
-            self.error(SetaException(
-                clsname='OperatorException',
-                msg=f'Unresolved operator {cmp} appeared at argument 2 "cmp".',
-                lineno=self.current['lineno'],
-                file=self.support.f.name,
-                code=self.current['code']
-            ))
+            self._err('OperatorException', 'Unresolved operator %s appeared at argument 2 "cmp".', cmp)
             return
         try:
             res: bool = oper(var1, var2)
         except Exception:
-            self.error(SetaException(
-                clsname='ComparisonException',
-                msg=f'Cannot compare value {arg1} with value {arg2}.',
-                lineno=self.current['lineno'],
-                file=self.support.f.name,
-                code=self.current['code']
-            ))
+            self._err('ComparisonException', 'Cannot compare value %s with value %s.', arg1, arg2)
             return
         if not res:
             self.ifs = 1
@@ -816,143 +588,76 @@ class SetaRuntime:
         pass
 
     def com_calc(self, operation: str, arg1: str, arg2: str, res: str):
-        oper = {
-            OPERATION_ADD: sys_operator.add,
-            OPERATION_SUB: sys_operator.sub,
-            OPERATION_MUL: sys_operator.mul,
-            OPERATION_DIV: sys_operator.truediv,
-            OPERATION_POWER: sys_operator.pow,
-        }.get(operation, None)
+        oper = _CALC_OPS.get(operation, None)
         if oper is None:
-            self.error(SetaException(
-                clsname='ArgumentException',
-                msg='Invalid operation. Possible operations: add, sub, mul, div, power.',
-                lineno=self.current['lineno'],
-                file=self.support.f.name,
-                code=self.current['code']
-            ))
+            self._err('ArgumentException', 'Invalid operation. Possible operations: add, sub, mul, div, power.')
             return
-        var1 = Seta.requireReal(arg1)
-        if arg1 == '@AMS':
-            var1 = self.ams
-        if var1 is None:
-            var1 = self.NamespaceSearch(arg1)
-        if var1 is None:
-            self.error(SetaException(
-                clsname='VariableException',
-                msg=f'Undeclared variable {arg1} cannot be resolved.',
-                lineno=self.current['lineno'],
-                file=self.support.f.name,
-                code=self.current['code']
-            ))
+        var1 = self._resolve_operand(arg1, operation)
+        if var1 is _UNRESOLVED:
             return
-        else:
-            var1 = var1.value if isinstance(var1, Variable) else var1
-        var2 = Seta.requireReal(arg2)
-        if arg2 == '@AMS':
-            var2 = self.ams
-        if var2 is None:
-            var2 = self.NamespaceSearch(arg2)
-        if var2 is None:
-            self.error(SetaException(
-                clsname='VariableException',
-                msg=f'Undeclared variable {arg2} cannot be resolved.',
-                lineno=self.current['lineno'],
-                file=self.support.f.name,
-                code=self.current['code']
-            ))
+        var2 = self._resolve_operand(arg2, operation)
+        if var2 is _UNRESOLVED:
             return
-        else:
-            var2 = var2.value if isinstance(var2, Variable) else var2
-        if operation == OPERATION_DIV and var2 == 0:
-            self.error(SetaException(
-                clsname='MathException',
-                msg=f'A numeric value cannot be divided by zero.',
-                lineno=self.current['lineno'],
-                file=self.support.f.name,
-                code=self.current['code']
-            ))
+        if oper is sys_operator.pow and var1 == var2 == 0:
+            self._err('MathException', 'The base of a zero exponential cannot be zero.')
             return
-        if operation == OPERATION_POWER and var1 == var2 == 0:
-            self.error(SetaException(
-                clsname='MathException',
-                msg=f'The base of a zero exponential cannot be zero.',
-                lineno=self.current['lineno'],
-                file=self.support.f.name,
-                code=self.current['code']
-            ))
+        try:
+            r = oper(var1, var2)
+        except ZeroDivisionError:  # Also raised by a zero base with a negative exponent
+            self._err('MathException', 'A numeric value cannot be divided by zero.')
+            return
+        except OverflowError:
+            self._err('MathException', 'The calculation result is out of range.')
             return
         if not Seta.requireIdentifier(res):
-            self.error(SetaException(
-                clsname='ArgumentException',
-                msg=f'Argument 3 "res" must be a valid identifier name.',
-                lineno=self.current['lineno'],
-                file=self.support.f.name,
-                code=self.current['code']
-            ))
+            self._err('ArgumentException', 'Argument 3 "res" must be a valid identifier name.')
             return
-        r = oper(var1, var2)
         self.ams = r
-        var = self.NamespaceSearch(res)
+        var = self._ns_get(res)
         if var is None:
             var = Variable(res, self, VARIABLE_NUMERIC)
             self.NamespaceInput(var)
-        var.set(r)
+        if var.numeric:
+            var.value = r  # The result is always numeric, no need for the type check of set()
+        else:
+            var.set(r)  # Reports the type mismatch
 
     def com_set(self, vType: str, name: str, value: str, *texts):
         if not Seta.requireIdentifier(name):
-            self.error(SetaException(
-                clsname='ArgumentException',
-                msg='Argument 2 "name" must be a valid identifier name.',
-                lineno=self.current['lineno'],
-                file=self.support.f.name,
-                code=self.current['code']
-            ))
+            self._err('ArgumentException', 'Argument 2 "name" must be a valid identifier name.')
             return
         if vType == 'numeric':
             value = Seta.requireReal(value)
             if value is None:
-                self.error(SetaException(
-                    clsname='TypeException',
-                    msg=f'Variable {name} is declared as numeric type, but non-numeric value is given.',
-                    lineno=self.current['lineno'],
-                    file=self.support.f.name,
-                    code=self.current['code']
-                ))
+                self._err('TypeException', 'Variable %s is declared as numeric type, but non-numeric value is'
+                                           ' given.', name)
                 return
-            if texts.__len__():
-                self.error(SetaException(
-                    clsname='ArgumentException',
-                    msg=f'Invalid number of the arguments: numeric setting operation expected 3 argument,'
-                        f' but {str(3 + texts.__len__())} was given.',
-                    lineno=self.current['lineno'],
-                    file=self.support.f.name,
-                    code=self.current['code']
-                ))
+            if texts:
+                self._err('ArgumentException', 'Invalid number of the arguments: numeric setting operation expected'
+                                               ' 3 argument, but %d was given.', 3 + len(texts))
                 return
             var = Variable(name, self, VARIABLE_NUMERIC)
             var.set(value)
             self.NamespaceInput(var)
         elif vType == 'cstring':
             var = Variable(name, self, VARIABLE_STRING_CONST)
-            var.set(' '.join([value, *texts]))
+            var.set(' '.join([value, *texts]) if texts else value)  # The parser keeps the spaces in value
             self.NamespaceInput(var)
         else:
-            self.error(SetaException(
-                clsname='ArgumentException',
-                msg=f'A type should be specified during a variable declaration. Possible types: numeric, cstring.',
-                lineno=self.current['lineno'],
-                file=self.support.f.name,
-                code=self.current['code']
-            ))
+            self._err('ArgumentException', 'A type should be specified during a variable declaration. Possible'
+                                           ' types: numeric, cstring.')
             return
 
 
 class SetaStringOperationCode:
-    def __init__(self, stream: StringIO, runtime: SetaRuntime):
+    def __init__(self, stream: TextIO, runtime: SetaRuntime):
         self.runtime = runtime
         self.f = stream
-        self.text = stream.readlines()
+        # One read; text mode already turned the line breaks into '\n'. Unlike
+        # str.splitlines(), this does not split on \f, \v or other separators.
+        self.text = stream.read().split('\n')
+        if not self.text[-1]:  # After the trailing newline, or an empty file
+            self.text.pop()
         self.pointer = 0
         precheck = self.precheck
         if precheck:
@@ -971,6 +676,9 @@ class SetaStringOperationCode:
                 file=stream.name,
                 code=stream.readline(),
             ))
+        # Split all the instructions once, so fetching one is only an index
+        self.tokens = [self.tokenize(l) for l in self.text[self.pointer:]]
+        self.pointer = 0
 
     @property
     def precheck(self) -> int:
@@ -991,9 +699,9 @@ class SetaStringOperationCode:
             self.pointer += 1
         except IndexError:
             line1 = EOF
-        if line1:
-            l = line1[:-1].split(' ')
-            if l.__len__() == 2:
+        if line1 is not EOF:
+            l = line1.split(' ')
+            if len(l) == 2:
                 flag: str = l[0]
                 version: str = l[1]
                 if flag != 'SETA-SOC':
@@ -1010,88 +718,89 @@ class SetaStringOperationCode:
         else:
             return 5
 
+    @staticmethod
+    def tokenize(l: str):
+        """
+        Split a line into an instruction.
+        :param l: the line read from the file
+        :return: (operation, arguments, opcode), the opcode is None for an unsupported operation
+        """
+        if not l:
+            return 'emp', (), OP_EMP
+        l = l.split(' ', 3)
+        op = _OPCODES.get(l[0].lower(), None)  # The source spelling is kept for error output
+        if len(l) == 4 and not (op == OP_SET and l[1] == 'cstring'):  # A cstring value keeps its spaces
+            l[3:] = l[3].split(' ')
+        if len(l) == 1:
+            return l[0], (), op
+        else:  # Names and "@AMS" are compared and looked up often
+            return l[0], tuple(map(sys.intern, l[1:])), op
+
     @property
     def instruction(self):
-        try:
-            l = self.text[self.pointer]
-            self.pointer += 1
-        except IndexError:
-            l = EOF
-        if not l:
+        if self.pointer >= len(self.tokens):
             return EOF
-        if l in ('\n', '\n\r'):
-            return 'emp', ()
-        l = l[:-1].split(' ')
-        if not l.__len__() - 1:
-            return l[0], ()
-        else:
-            return l[0], l[1:]
+        t = self.tokens[self.pointer]
+        self.pointer += 1
+        return t
 
 
 class Seta:
     version = 1.0
 
     @staticmethod
+    @functools.lru_cache(maxsize=1024)  # The same literals and names recur across a program
     def requireInt(i: str):
-        try:
-            r = eval(i)
-        except Exception:
+        if not i.isascii():  # int() also takes non-ASCII digits, which are not Seta literals
             return None
-        if not isinstance(r, int):
+        try:
+            return int(i)
+        except ValueError:
             return None
-        else:
-            return r
 
     @staticmethod
     def requireFloat(f: str):
-        try:
-            r = eval(f)
-        except Exception:
-            return None
-        if not isinstance(r, float):
+        r = Seta.requireReal(f)
+        if not isinstance(r, float):  # Integer literals are not accepted
             return None
         else:
             return r
 
     @staticmethod
+    @functools.lru_cache(maxsize=1024)
     def requireReal(r: str):
+        if not r.isascii():
+            return None
         try:
-            r = eval(r)
-        except Exception:
+            return int(r)
+        except ValueError:
+            pass
+        if r.strip().lstrip('+-')[:1].isalpha():  # "inf", "nan" and so on are names in Seta
             return None
-        if isinstance(r, int) or isinstance(r, float):
-            return r
-        else:
+        try:
+            return float(r)
+        except ValueError:
             return None
 
     @staticmethod
     def requireImg(i: str):
+        if not i.isascii() or Seta.requireReal(i) is not None or 'n' in i.lower() \
+                or i.strip().lstrip('+-')[:1].isalpha():
+            return None  # A real number, or it uses the names "inf" or "nan"
         try:
-            r = eval(i)
-        except Exception:
-            return None
-        if not isinstance(r, complex):
+            return complex(i)
+        except ValueError:
             return None
-        else:
-            return r
 
     @staticmethod
+    @functools.lru_cache(maxsize=1024)
     def requireIdentifier(i: str) -> bool:
         """
         Check if a string can be an identifier.
         :param i: identifier name
         :return: judging result
         """
-        if not i:
-            return False
-        for char in i:
-            if 'a' <= char <= 'z' or 'A' <= char <= 'Z' or \
-                    char in ('0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '_', '#'):
-                continue
-            return False
-        if i[0] in ('0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '#'):
-            return False
-        return True
+        return _IDENTIFIER.fullmatch(i) is not None
 
     def run(self):
         self.runtime.run()
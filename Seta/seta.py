@@ -6,7 +6,7 @@ import colorama
 
 colorama.init(autoreset=False)
 
-if sys.argv.__len__() != 2:
+if len(sys.argv) != 2:
     print('\033[31mERROR: no source file.\033[0m')
     sys.exit(1)
 
@@ -1,25 +0,0 @@
-# -*- coding:utf-8 -*-
-
-
-def above(a, b):
-    return a > b
-
-
-def below(a, b):
-    return a < b
-
-
-def equal(a, b):
-    return a == b
-
-
-def notabove(a, b):
-    return a <= b
-
-
-def notbelow(a, b):
-    return a >= b
-
-
-def notequal(a, b):
-    return a != b